@@ -14,11 +14,20 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import io
 import os
+import re
+import shlex
+import shutil
 import subprocess
 import argparse
-import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
 import pandas as pd
+import xxhash
+import zstandard as zstd
+from numba import njit
 
 # For extracting fields from Tshark output.
 kTCPPayloadIndex = 0
@@ -30,6 +39,22 @@ kTCPSrcPortIndex = 5
 kUDPSrcPortIndex = 6
 kTCPDstPortIndex = 7
 kUDPDstPortIndex = 8
+# Per-protocol packet length fields (one column per ProtocolParsingSpecs entry)
+# start right after the fixed fields.
+kPacketLengthsStartIndex = kUDPDstPortIndex + 1
+
+# Columns of the packet level tsv files produced by gen_tsv.
+kPacketColumns = ["payload", "protocol", "src_addr", "dst_addr", "src_port", "dst_port"]
+
+# Putting http after http2/grpc since it can overlap with http2 and grpc.
+kProtocols = ["http2", "mysql", "pgsql", "cql", "amqp", "redis", "dns", "mongo", "http", "ssh",
+              "kafka", "mux", "tls"]
+
+# Matches the known protocol keywords in a single scan. frame.protocols lists
+# layers outermost first, so the greedy .* prefix makes the last (most
+# specific) matching keyword win, e.g. http2 over http/tls in
+# sll:ethertype:ip:tcp:http:http2:grpc.
+_PROTO_RE = re.compile(r".*(" + "|".join(kProtocols) + r")")
 
 
 # For parsing out packets from TCP payload.
@@ -55,22 +80,172 @@ ProtocolParsingSpecs = {
              "extra_length": kAMQPExtraLength}
 }
 
+# Small int protocol ids (kProtocols indices) used on the hot path instead of
+# strings; kUnknownProtocolId marks frames with no known protocol.
+kProtocolIds = {protocol: i for i, protocol in enumerate(kProtocols)}
+kProtocolNames = np.array(kProtocols)
+kUnknownProtocolId = -1
+
+# extra_length indexed by protocol id; -1 marks protocols that are not split
+# by packet lengths.
+kExtraLengths = np.full(len(kProtocols), -1, dtype=np.int32)
+for _protocol, _spec in ProtocolParsingSpecs.items():
+    kExtraLengths[kProtocolIds[_protocol]] = _spec["extra_length"]
+
 # TODO(chengruizhe): Add unit tests for dataset_generation.
 
 
+@njit(cache=True)
+def _table_check_and_insert(keys, payload_hash):
+    """
+    Probes the open-addressing table for payload_hash and inserts it if absent.
+    Returns whether it was already present. keys must have a power-of-two size
+    and uses 0 as the empty slot sentinel.
+    """
+    mask = len(keys) - 1
+    i = payload_hash & mask
+    while keys[i] != 0:
+        if keys[i] == payload_hash:
+            return True
+        i = (i + 1) & mask
+    keys[i] = payload_hash
+    return False
+
+
+@njit(cache=True)
+def _bloom_test_and_set(bloom_bits, payload_hash):
+    """
+    Sets the two bloom filter bits derived from payload_hash and returns
+    whether both were already set (i.e. the payload may have been seen).
+    """
+    index_mask = kBloomBits - 1
+    seen = True
+    for index in (payload_hash & index_mask, (payload_hash >> 26) & index_mask):
+        bit = np.int64(1) << (index & 63)
+        if bloom_bits[index >> 6] & bit == 0:
+            seen = False
+            bloom_bits[index >> 6] |= bit
+    return seen
+
+
+@njit(cache=True)
+def _check_duplicate_one(recent, bloom_bits, keys, payload_hash):
+    """
+    Runs one digest through the recent cache, bloom filter, and exact bank.
+    Returns (is_duplicate, inserted_into_bank).
+    """
+    slot = payload_hash & (len(recent) - 1)
+    if recent[slot] == payload_hash:
+        return True, False
+    recent[slot] = payload_hash
+
+    # Digests the bloom filter has never seen are definitely new and stay out
+    # of the bank entirely; only suspected repeats are tracked exactly.
+    if not _bloom_test_and_set(bloom_bits, payload_hash):
+        return False, False
+    if _table_check_and_insert(keys, payload_hash):
+        return True, False
+    return False, True
+
+
+@njit(cache=True)
+def _check_duplicates_batch(recent, bloom_bits, keys, payload_hashes):
+    duplicates = np.empty(len(payload_hashes), dtype=np.bool_)
+    inserted = 0
+    for j in range(len(payload_hashes)):
+        duplicates[j], new_entry = _check_duplicate_one(recent, bloom_bits, keys,
+                                                        payload_hashes[j])
+        if new_entry:
+            inserted += 1
+    return duplicates, inserted
+
+
+@njit(cache=True)
+def _table_rehash(old_keys, new_keys):
+    mask = len(new_keys) - 1
+    for payload_hash in old_keys:
+        if payload_hash == 0:
+            continue
+        i = payload_hash & mask
+        while new_keys[i] != 0:
+            i = (i + 1) & mask
+        new_keys[i] = payload_hash
+
+
+# Hashes are truncated to 63 bits so they fit a non-negative int64, with 0
+# reserved as the empty slot sentinel.
+kHashMask = (1 << 63) - 1
+
+kInitialBankCapacity = 1 << 16
+kMaxBankLoadFactor = 0.6
+
+# Bloom filter front-end: 2^26 bits (8 MiB) with two probes per digest.
+kBloomBits = 1 << 26
+# Direct-mapped cache of recently seen digests (1 MiB).
+kRecentCacheSlots = 1 << 17
+
+# Number of tshark rows parsed per chunk when streaming from a pipe.
+kStreamChunkSize = 1 << 16
+
+# Compression level for the consolidated dataset files.
+kZstdLevel = 3
+
+
+def hash_payload(payload):
+    """
+    63-bit xxh3 digest of the payload bytes, guaranteed nonzero so it can go
+    straight into the DuplicateChecker bank. xxh3 is much cheaper than a
+    cryptographic hash, and a fresh digest per payload (rather than a running
+    hasher) is required for correctness.
+    """
+    return (xxhash.xxh3_64_intdigest(payload) & kHashMask) or 1
+
+
 class DuplicateChecker:
+    """
+    Tracks the payloads seen so far in three tiers of xxh3 digests: a
+    direct-mapped cache of recent digests (catches the common case of repeats
+    within the same stream), a fixed-size bloom filter that answers
+    "definitely new" in one cache line, and an exact open-addressing bank that
+    only holds digests whose bloom bits were already set. This keeps dedup
+    memory roughly an order of magnitude below a full table on long captures.
+    The tradeoff is that the first repeat of a payload can go undetected once
+    it has aged out of the recent cache, since brand-new digests only mark the
+    bloom filter; repeats after that hit the bank exactly.
+    """
+
     def __init__(self):
-        self.bank = set()
-        self.hash_fn = hashlib.md5()
+        self.recent = np.zeros(kRecentCacheSlots, dtype=np.int64)
+        self.bloom = np.zeros(kBloomBits // 64, dtype=np.int64)
+        self.bank = np.zeros(kInitialBankCapacity, dtype=np.int64)
+        self.size = 0
 
     def check_duplicate(self, payload):
-        self.hash_fn.update(payload.encode('utf-8'))
-        hash = self.hash_fn.hexdigest()
-        if hash in self.bank:
-            return True
-        else:
-            self.bank.add(hash)
-            return False
+        duplicate, new_entry = _check_duplicate_one(self.recent, self.bloom, self.bank,
+                                                    hash_payload(payload))
+        if new_entry:
+            self.size += 1
+            if self.size > kMaxBankLoadFactor * len(self.bank):
+                self._grow()
+        return duplicate
+
+    def check_duplicates(self, payload_hashes):
+        """
+        Batch variant of check_duplicate. Takes an int64 array of hash_payload
+        digests and returns a bool array marking the duplicates.
+        """
+        # Grow up front so the whole batch fits under the load factor.
+        while self.size + len(payload_hashes) > kMaxBankLoadFactor * len(self.bank):
+            self._grow()
+        duplicates, inserted = _check_duplicates_batch(self.recent, self.bloom, self.bank,
+                                                       payload_hashes)
+        self.size += inserted
+        return duplicates
+
+    def _grow(self):
+        old_bank = self.bank
+        self.bank = np.zeros(2 * len(old_bank), dtype=np.int64)
+        _table_rehash(old_bank, self.bank)
 
 
 def gen_tshark_cmd():
@@ -92,39 +267,49 @@ def gen_tshark_cmd():
     for protocol, spec in ProtocolParsingSpecs.items():
         field_name = spec["length_field"]
         tshark_cmd += f" -e {protocol}.{field_name}"
-    tshark_cmd += " > {output_file}"
+
+    # Documents the layers the pipeline extracts fields from. -j only filters
+    # -T ek/pdml/json output, so it is inert under -T fields; it takes effect
+    # if this command is ever switched to one of those formats.
+    tshark_cmd += ' -j "ip tcp udp ' + " ".join(kProtocols) + '"'
     return tshark_cmd
 
 
-def run_tshark(pcap_path, cmd):
-    output_file = pcap_path[:-6] + "txt"
-    tshark_cmd = cmd.format(pcap_file=pcap_path, output_file=output_file)
-    subprocess.run(tshark_cmd, shell=True, capture_output=False)
-    return output_file
+@njit(cache=True)
+def _split_offsets(payload_len, packet_lengths, extra_len):
+    """
+    Computes [start, end) byte offset pairs into the payload for each packet.
+    Compiled with numba since this loop runs once per length-split row.
+    """
+    offsets = np.empty(2 * len(packet_lengths), dtype=np.int64)
+    offset = 0
+    n = 0
+    for length in packet_lengths:
+        if offset >= payload_len:
+            break
+
+        packet_num_bytes = length + extra_len
+        offsets[n] = offset
+        offsets[n + 1] = offset + packet_num_bytes
+        offset += packet_num_bytes
+        n += 2
+    return offsets[:n]
 
 
-def split_by_length(payload, packet_lengths, protocol):
+def split_by_length(payload, packet_lengths, protocol_id):
     """
     Breaks up payload into packets (for protocols such as MySQL and AMQP).
-    :param payload: payload string to be broken up
+    :param payload: payload bytes to be broken up
     :param packet_lengths: lengths of the packets in bytes
-    :param protocol: how we peel off packets depends on the protocol
-    :return: A list of strings
+    :param protocol_id: kProtocols index; how we peel off packets depends on the protocol
+    :return: A list of bytes
     """
-    assert protocol in ProtocolParsingSpecs, f"Protocol {protocol} not in ParsingSpecs."
-    extra_len = ProtocolParsingSpecs[protocol]["extra_length"]
+    extra_len = kExtraLengths[protocol_id]
+    assert extra_len >= 0, f"Protocol {kProtocolNames[protocol_id]} not in ParsingSpecs."
 
-    packets = []
-    offset = 0
-    for length in packet_lengths:
-        if offset >= len(payload):
-            return packets
-
-        # Convert from number of bytes to number of hex chars.
-        packet_num_hex = (length + extra_len) * 2
-        packets.append(payload[offset:offset + packet_num_hex])
-        offset += packet_num_hex
-    return packets
+    packet_lengths = np.asarray(packet_lengths, dtype=np.int32)
+    offsets = _split_offsets(len(payload), packet_lengths, extra_len)
+    return [payload[offsets[i]:offsets[i + 1]] for i in range(0, len(offsets), 2)]
 
 
 def parse_protocol(frame_protocol):
@@ -133,25 +318,70 @@ def parse_protocol(frame_protocol):
     :param frame_protocol: Example: sll:ethertype:ip:tcp:http:http2:grpc
     :return: Example: http2
     """
-    # Putting http after http2/grpc since it can overlap with http2 and grpc.
-    protocols = ["http2", "mysql", "pgsql", "cql", "amqp", "redis", "dns", "mongo", "http", "ssh",
-                 "kafka", "mux", "tls"]
-    for protocol in protocols:
-        if protocol in frame_protocol:
-            return protocol
-    else:
-        return "unknown"
+    match = _PROTO_RE.match(frame_protocol)
+    return match.group(1) if match else "unknown"
 
 
-def get_packet_lengths_field(line):
+def _process_frame(df, duplicate_checker, out_file):
     """
-    Parse out the packet lengths field at the end of a line. Returns none if the protocol
-    doesn't have the field.
+    Converts one frame of raw tshark rows into non-duplicate packet rows
+    appended to out_file. Shared by gen_tsv (whole file) and
+    gen_tsv_from_stream (chunks of a pipe).
     """
-    for field in line[kUDPDstPortIndex + 1:]:
-        if field:
-            return [int(length) for length in field.split(",")]
-    return None
+    frame_protocols = df[kProtocolIndex]
+    protocol_ids = (frame_protocols.str.extract(_PROTO_RE, expand=False).map(kProtocolIds)
+                    .fillna(kUnknownProtocolId).astype(np.int8).to_numpy())
+    # If tcp is not in protocol, defaults to udp
+    is_tcp = frame_protocols.str.contains("tcp", regex=False).to_numpy()
+
+    known = protocol_ids != kUnknownProtocolId
+    df, protocol_ids, is_tcp = df[known], protocol_ids[known], is_tcp[known]
+    # Protocol names are only needed again when the rows are written out.
+    protocol = kProtocolNames[protocol_ids]
+
+    payload = np.where(is_tcp, df[kTCPPayloadIndex], df[kUDPPayloadIndex])
+    src_port = np.where(is_tcp, df[kTCPSrcPortIndex], df[kUDPSrcPortIndex]).astype(np.int64)
+    dst_port = np.where(is_tcp, df[kTCPDstPortIndex], df[kUDPDstPortIndex]).astype(np.int64)
+
+    # The first non-empty length field of a row, if any, holds its packet lengths.
+    length_cols = [df[i].to_numpy() for i in range(kPacketLengthsStartIndex, df.shape[1])]
+    if length_cols:
+        packet_lengths = np.select([c != "" for c in length_cols], length_cols, default="")
+    else:
+        packet_lengths = np.full(len(df), "")
+
+    # Explode length-split payloads into one entry per packet, remembering the
+    # source row of each packet. Payloads are decoded once so that splitting
+    # and hashing touch half as many bytes; only written packets get re-hexed.
+    packets = []
+    packet_row = []
+    for i, (p, proto_id, lengths) in enumerate(zip(payload, protocol_ids, packet_lengths)):
+        payload_bytes = bytes.fromhex(p)
+        if lengths:
+            # np.fromstring parses the comma-separated lengths in C, and the
+            # int32 array feeds the numba kernel without reconversion.
+            split = split_by_length(payload_bytes,
+                                    np.fromstring(lengths, dtype=np.int32, sep=","), proto_id)
+        else:
+            split = [payload_bytes]
+        packets.extend(split)
+        packet_row.extend([i] * len(split))
+
+    # One hash-table pass marks both within-frame and already-seen duplicates.
+    payload_hashes = np.fromiter((hash_payload(packet) for packet in packets),
+                                 dtype=np.int64, count=len(packets))
+    unique = ~duplicate_checker.check_duplicates(payload_hashes)
+    row_idx = np.asarray(packet_row, dtype=np.int64)[unique]
+
+    out = pd.DataFrame({
+        "payload": [packet.hex() for packet, keep in zip(packets, unique) if keep],
+        "protocol": protocol[row_idx],
+        "src_addr": df[kIPSrcIndex].to_numpy()[row_idx],
+        "dst_addr": df[kIPDstIndex].to_numpy()[row_idx],
+        "src_port": src_port[row_idx],
+        "dst_port": dst_port[row_idx],
+    })
+    out.to_csv(out_file, sep="\t", header=False, index=False)
 
 
 def gen_tsv(input_path, output_path):
@@ -164,99 +394,126 @@ def gen_tsv(input_path, output_path):
     assert os.path.exists(input_path)
 
     duplicate_checker = DuplicateChecker()
-    with open(input_path, "r") as in_file, open(output_path, "w") as out_file:
-        for line in in_file.readlines():
-            # Format: tcp_payload, udp_payload, protocol, tcp_src, udp_src, tcp_dst, udp_dst,
-            # packet_lengths
-            line = line.split("\t")
-            if line[-1] == "\n":
-                line = line[:-1]
-
-            # If tcp is not in protocol, defaults to udp
-            is_tcp = "tcp" in line[kProtocolIndex]
-            protocol = parse_protocol(line[kProtocolIndex])
-
-            if protocol == "unknown":
-                continue
+    with open(output_path, "w") as out_file:
+        # Format: tcp_payload, udp_payload, protocol, ip_src, ip_dst, tcp_srcport,
+        # udp_srcport, tcp_dstport, udp_dstport, packet_lengths (one column per
+        # ProtocolParsingSpecs entry)
+        try:
+            df = pd.read_csv(input_path, sep="\t", header=None, dtype=str, na_filter=False)
+        except pd.errors.EmptyDataError:
+            return
+        _process_frame(df, duplicate_checker, out_file)
+
+
+def gen_tsv_from_stream(in_stream, output_path):
+    """
+    Variant of gen_tsv that consumes tshark output from a text stream (e.g. a
+    pipe) in chunks of kStreamChunkSize rows, so captures never round-trip
+    through a txt file but still go through the vectorized parsing path. The
+    shared DuplicateChecker keeps deduplication exact across chunks.
+    """
+    duplicate_checker = DuplicateChecker()
+    with open(output_path, "w") as out_file:
+        try:
+            chunks = pd.read_csv(in_stream, sep="\t", header=None, dtype=str,
+                                 na_filter=False, chunksize=kStreamChunkSize)
+            for df in chunks:
+                _process_frame(df, duplicate_checker, out_file)
+        except pd.errors.EmptyDataError:
+            return
 
-            src_addr = line[kIPSrcIndex]
-            dst_addr = line[kIPDstIndex]
 
-            if is_tcp:
-                payload = line[kTCPPayloadIndex]
-                src_port = int(line[kTCPSrcPortIndex])
-                dst_port = int(line[kTCPDstPortIndex])
-            else:
-                payload = line[kUDPPayloadIndex]
-                src_port = int(line[kUDPSrcPortIndex])
-                dst_port = int(line[kUDPDstPortIndex])
+def process_pcap(pcap_path, tshark_cmd):
+    """
+    Runs tshark on one pcap file and streams its output into a tsv.
+    """
+    tsv_output = pcap_path[:-6] + "tsv"
+    proc = subprocess.Popen(shlex.split(tshark_cmd.format(pcap_file=pcap_path)),
+                            stdout=subprocess.PIPE, bufsize=1 << 20, text=True)
+    gen_tsv_from_stream(proc.stdout, tsv_output)
+    proc.wait()
 
-            packet_lengths = get_packet_lengths_field(line)
-            if packet_lengths:
-                packets = split_by_length(payload, packet_lengths, protocol)
-            else:
-                packets = [payload]
 
-            for p in packets:
-                if not duplicate_checker.check_duplicate(p):
-                    row = f"{p}\t{protocol}\t{src_addr}\t{dst_addr}\t{src_port}\t{dst_port}\n"
-                    out_file.write(row)
+def iter_files_by_suffix(data_root, suffix):
+    """
+    Yields the paths of all data_root/<capture_run>/<pod>/ files with the given
+    suffix. os.scandir reuses the file type from the readdir results, avoiding
+    a stat() syscall per directory entry.
+    """
+    for capture_run in os.scandir(data_root):
+        if not capture_run.is_dir():
+            continue
+        for pod in os.scandir(capture_run.path):
+            if not pod.is_dir():
+                continue
+            for entry in os.scandir(pod.path):
+                if entry.is_file() and entry.name.endswith(suffix):
+                    yield entry.path
 
 
 def get_tsv_paths(data_root):
     """
     Returns the paths to all the tsv files in the dataset.
     """
-    results = []
+    return list(iter_files_by_suffix(data_root, ".tsv"))
 
-    for capture_run in os.listdir(data_root):
-        capture_path = os.path.join(data_root, capture_run)
-        if not os.path.isdir(capture_path):
-            continue
-        for pod_name in os.listdir(capture_path):
-            if not os.path.isdir(os.path.join(capture_path, pod_name)):
-                continue
-            tsv_files = [f for f in os.listdir(os.path.join(capture_path, pod_name))
-                         if f.endswith(".tsv")]
-            for tsv in tsv_files:
-                results.append(os.path.join(capture_path, pod_name, tsv))
-    return results
+
+def open_compressed_output(path):
+    """
+    Opens a zstd stream writer for a consolidated dataset file. The file is
+    truncated so each run produces a single zstd frame: the pinned zstandard
+    release does not read across frames by default, so appended frames would
+    be silently dropped by pandas readers.
+    """
+    raw_file = open(path, "wb")
+    cctx = zstd.ZstdCompressor(level=kZstdLevel, threads=-1)
+    return cctx.stream_writer(raw_file, closefd=True)
+
+
+def read_packet_tsv(tsv_path):
+    """
+    Loads a packet level tsv produced by gen_tsv into a DataFrame.
+    """
+    # The pyarrow engine rejects empty csv files, which pods without any
+    # non-duplicate packets do produce.
+    if os.path.getsize(tsv_path) == 0:
+        return pd.DataFrame(columns=kPacketColumns)
+    return pd.read_csv(tsv_path, delimiter='\t', names=kPacketColumns,
+                       engine="pyarrow", dtype={"payload": "string[pyarrow]"})
 
 
-def gen_conn_tsv(tsv_file, out_file):
+def gen_conn_tsv(df, out_file):
     """
     Does a groupby on packet level data and aggregate to output connection level data.
     """
-    df = pd.read_csv(tsv_file, delimiter='\t',
-                     names=["payload", "protocol", "src_addr", "dst_addr", "src_port", "dst_port"])
-    conn_data = df.groupby(["protocol", "src_addr", "dst_addr", "src_port", "dst_port"],
-                           as_index=False).agg({"payload": lambda x: ",".join(x)})
+    conn_cols = ["protocol", "src_addr", "dst_addr", "src_port", "dst_port"]
+    # Categorical grouping keys are faster and lighter to group on than
+    # object-dtype strings, and ",".join avoids the per-group lambda call.
+    df[conn_cols] = df[conn_cols].astype("category")
+    conn_data = df.groupby(conn_cols, sort=False, observed=True,
+                           as_index=False).agg(payload=("payload", ",".join))
     conn_data.to_csv(out_file, sep="\t",
                      columns=["payload", "protocol", "src_addr", "dst_addr", "src_port",
                               "dst_port"], header=False, index=False)
 
 
-def gen_bidirectional_tsv(tsv_file, out_file):
+def gen_bidirectional_tsv(df, out_file):
     """
     Make the packets direction agnostic and group them to output bi-directional connection data.
     """
-    df = pd.read_csv(tsv_file, delimiter='\t',
-                     names=["payload", "protocol", "src_addr", "dst_addr", "src_port", "dst_port"])
     if df.empty:
         return
 
-    def merge_addr_port(row):
-        src = str(row["src_addr"]) + ":" + str(row["src_port"])
-        dst = str(row["dst_addr"]) + ":" + str(row["dst_port"])
-        if src > dst:
-            return src + " " + dst
-        else:
-            return dst + " " + src
-
-    # Map addr and port to a direction-agnostic string
-    df["bidir_conn"] = df.apply(merge_addr_port, axis=1)
-    bidir_conn_data = df.groupby(["protocol", "bidir_conn"],
-                                 as_index=False).agg({"payload": lambda x: ",".join(x)})
+    # Map addr and port to a direction-agnostic string, with the larger
+    # addr:port endpoint first.
+    src = (df["src_addr"].astype(str) + ":" + df["src_port"].astype(str)).to_numpy()
+    dst = (df["dst_addr"].astype(str) + ":" + df["dst_port"].astype(str)).to_numpy()
+    swap = src > dst
+    df["bidir_conn"] = np.where(swap, src, dst) + " " + np.where(swap, dst, src)
+    df["protocol"] = df["protocol"].astype("category")
+    df["bidir_conn"] = df["bidir_conn"].astype("category")
+    bidir_conn_data = df.groupby(["protocol", "bidir_conn"], sort=False, observed=True,
+                                 as_index=False).agg(payload=("payload", ",".join))
     bidir_conn_data.to_csv(out_file, sep="\t",
                            columns=["payload", "protocol"], header=False, index=False)
 
@@ -279,41 +536,34 @@ if __name__ == "__main__":
     #     --Captures2
     #         --pod1
     # Generate a tsv file containing data in each pod folder.
-    for capture_run in os.listdir(args.dataset):
-        capture_path = os.path.join(args.dataset, capture_run)
-        if not os.path.isdir(capture_path):
-            continue
-        print("Processing capture: ", capture_run)
-        for pod_name in os.listdir(capture_path):
-            print("Processing pod: ", pod_name)
-            if not os.path.isdir(os.path.join(capture_path, pod_name)):
-                continue
-            pcap_files = [f for f in os.listdir(os.path.join(capture_path, pod_name))
-                          if f.endswith(".pcapng")]
-            for pcap in pcap_files:
-                pcap_path = os.path.join(capture_path, pod_name, pcap)
-                tshark_output = run_tshark(pcap_path, tshark_cmd)
-                tsv_output = tshark_output[:-3] + "tsv"
-                gen_tsv(input_path=tshark_output, output_path=tsv_output)
+    pcap_paths = list(iter_files_by_suffix(args.dataset, ".pcapng"))
+    print("Processing", len(pcap_paths), "pcap files")
 
-    tsv_paths = get_tsv_paths(args.dataset)
+    # Each pcap is independent, so fan the tshark + gen_tsv work out across cores.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(partial(process_pcap, tshark_cmd=tshark_cmd), pcap_paths))
 
-    # Consolidate the tsv files into a big tsv with each row representing a packet.
-    with open(os.path.join(args.dataset, "packet_dataset.tsv"), "a+") as out_file:
-        for tsv_path in tsv_paths:
-            with open(tsv_path) as tsv_file:
-                out_file.write(tsv_file.read())
-
-    # Consolidate the tsv files into a big tsv with connection level data. This
-    # enables building models taking multiple packets in a data stream.
-    with open(os.path.join(args.dataset, "conn_dataset.tsv"), "a+") as out_file:
-        for tsv_path in tsv_paths:
-            with open(tsv_path) as tsv_file:
-                gen_conn_tsv(tsv_file, out_file)
+    tsv_paths = get_tsv_paths(args.dataset)
 
-    # Consolidate the tsv files into a big tsv with bi-direction connection level data.
-    # Request and response packets are grouped into one bi-directional connection.
-    with open(os.path.join(args.dataset, "bi_dir_conn_dataset.tsv"), "a+") as out_file:
+    # Consolidate the tsv files in one pass, parsing each per-pod tsv once.
+    # The outputs are regenerated from scratch each run and zstd compressed;
+    # pd.read_csv decompresses them transparently based on the .zst suffix:
+    # - packet_dataset.tsv.zst: one row per packet.
+    # - conn_dataset.tsv.zst: connection level data, which enables building
+    #   models taking multiple packets in a data stream.
+    # - bi_dir_conn_dataset.tsv.zst: bi-directional connection level data, with
+    #   request and response packets grouped into one connection.
+    with open_compressed_output(os.path.join(args.dataset, "packet_dataset.tsv.zst")) \
+            as packet_out, \
+            io.TextIOWrapper(open_compressed_output(
+                os.path.join(args.dataset, "conn_dataset.tsv.zst"))) as conn_out, \
+            io.TextIOWrapper(open_compressed_output(
+                os.path.join(args.dataset, "bi_dir_conn_dataset.tsv.zst"))) as bidir_out:
         for tsv_path in tsv_paths:
-            with open(tsv_path) as tsv_file:
-                gen_bidirectional_tsv(tsv_file, out_file)
+            # The packet level rows need no parsing at all; copy them straight
+            # into the compressor.
+            with open(tsv_path, "rb") as tsv_file:
+                shutil.copyfileobj(tsv_file, packet_out, 1 << 20)
+            df = read_packet_tsv(tsv_path)
+            gen_conn_tsv(df, conn_out)
+            gen_bidirectional_tsv(df, bidir_out)